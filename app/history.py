@@ -0,0 +1,241 @@
+# app/history.py
+# Columnar run-history store for A/B runs.
+#
+# Layout under the history root (default: results/history):
+#   metrics/<run_id>.parquet   one file per run; scores only, no output text
+#   outputs/<run_id>.parquet   generated text, read on demand per run
+#
+# run_id is "<YYYYmmdd_HHMMSS>_<run folder name>", so file names sort in run_ts
+# order (query_page relies on this for newest-first paging) and two run folders
+# with the same name but different parents/times don't overwrite each other.
+#
+# model/task columns are dictionary-encoded so scans across many runs stay
+# cheap, and every query pushes its filters down to the Parquet reader
+# instead of loading whole result sets into memory.
+
+from __future__ import annotations
+import datetime, pathlib
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+HISTORY_DIR = "results/history"
+
+_DICT_STR = pa.dictionary(pa.int32(), pa.string())
+DICT_COLUMNS = ["task", "model_type", "model_name"]
+METRIC_COLUMNS = ["keyword_coverage", "quantify_score", "composite_score"]
+
+METRICS_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("run_ts", pa.timestamp("s")),
+    ("sample_id", pa.string()),
+    ("task", _DICT_STR),
+    ("model_type", _DICT_STR),
+    ("model_name", _DICT_STR),
+    ("keyword_coverage", pa.float64()),
+    ("quantify_score", pa.float64()),
+    ("length_ok", pa.bool_()),
+    ("composite_score", pa.float64()),
+])
+
+OUTPUTS_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("sample_id", pa.string()),
+    ("task", _DICT_STR),
+    ("model_type", _DICT_STR),
+    ("output", pa.string()),
+])
+
+def _metrics_dir(root: str | pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(root) / "metrics"
+
+def _outputs_dir(root: str | pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(root) / "outputs"
+
+def _to_table(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    cols = {}
+    for field in schema:
+        s = df[field.name] if field.name in df.columns else pd.Series([None] * len(df))
+        if pa.types.is_boolean(field.type):
+            s = s.astype("object").where(s.notna(), None)
+        cols[field.name] = pa.array(s.tolist(), type=field.type, from_pandas=True)
+    return pa.table(cols, schema=schema)
+
+def make_run_id(name: str, run_ts: datetime.datetime) -> str:
+    return f"{run_ts:%Y%m%d_%H%M%S}_{name}"
+
+def append_run(df: pd.DataFrame, name: str, root: str | pathlib.Path = HISTORY_DIR,
+               run_ts: Optional[datetime.datetime] = None) -> Optional[str]:
+    """
+    Append one A/B run (the rows produced by _run_ab_once) to the store under
+    make_run_id(name, run_ts). Re-appending the same name and run_ts replaces
+    that run. Returns the run_id, or None if df has no rows.
+    """
+    if df.empty:
+        return None
+    run_ts = (run_ts or datetime.datetime.now()).replace(microsecond=0)
+    run_id = make_run_id(name, run_ts)
+    df = df.assign(run_id=run_id, run_ts=run_ts)
+
+    for d in (_metrics_dir(root), _outputs_dir(root)):
+        d.mkdir(parents=True, exist_ok=True)
+
+    pq.write_table(_to_table(df, METRICS_SCHEMA), _metrics_dir(root) / f"{run_id}.parquet",
+                   use_dictionary=DICT_COLUMNS)
+    pq.write_table(_to_table(df, OUTPUTS_SCHEMA), _outputs_dir(root) / f"{run_id}.parquet",
+                   use_dictionary=["task", "model_type"], compression="zstd")
+    return run_id
+
+def run_dir_ts(run_dir: str | pathlib.Path) -> datetime.datetime:
+    """Run time of a results folder: from an ab_run_<ts> name, else results.csv mtime."""
+    run_dir = pathlib.Path(run_dir)
+    try:
+        return datetime.datetime.strptime(run_dir.name.removeprefix("ab_run_"), "%Y%m%d_%H%M%S")
+    except ValueError:
+        return datetime.datetime.fromtimestamp((run_dir / "results.csv").stat().st_mtime).replace(microsecond=0)
+
+def is_imported(run_dir: str | pathlib.Path, root: str | pathlib.Path = HISTORY_DIR) -> bool:
+    run_dir = pathlib.Path(run_dir)
+    run_id = make_run_id(run_dir.name, run_dir_ts(run_dir))
+    return (_metrics_dir(root) / f"{run_id}.parquet").exists()
+
+def import_problem(run_dir: str | pathlib.Path) -> Optional[str]:
+    """
+    Why a results folder can't be imported, or None if it can. Only reads the
+    header and first row of results.csv, so it is cheap enough to run per folder.
+    """
+    csv = pathlib.Path(run_dir) / "results.csv"
+    if not csv.exists():
+        return "no results.csv"
+    try:
+        head = pd.read_csv(csv, nrows=1)
+    except (pd.errors.EmptyDataError, ValueError):
+        return "empty or unreadable results.csv"
+    if head.empty:
+        return "empty or unreadable results.csv"
+    return None
+
+def import_run_dir(run_dir: str | pathlib.Path, root: str | pathlib.Path = HISTORY_DIR) -> bool:
+    """
+    Import a legacy results/ab_run_<ts>/ folder (results.csv) into the store.
+    Returns False if import_problem() reports the folder can't be imported
+    (e.g. a run that produced no rows).
+    """
+    run_dir = pathlib.Path(run_dir)
+    if import_problem(run_dir) is not None:
+        return False
+    try:
+        df = pd.read_csv(run_dir / "results.csv", dtype={"sample_id": str, "output": str})
+    except (pd.errors.EmptyDataError, ValueError):
+        return False
+    return append_run(df, run_dir.name, root=root, run_ts=run_dir_ts(run_dir)) is not None
+
+def store_version(root: str | pathlib.Path = HISTORY_DIR) -> tuple:
+    """Cheap fingerprint of the store, used as a cache key by the UI."""
+    d = _metrics_dir(root)
+    if not d.exists():
+        return ()
+    return tuple(sorted((p.name, p.stat().st_mtime_ns) for p in d.glob("*.parquet")))
+
+def _dataset(root: str | pathlib.Path) -> Optional[ds.Dataset]:
+    d = _metrics_dir(root)
+    files = sorted(str(p) for p in d.glob("*.parquet")) if d.exists() else []
+    if not files:
+        return None
+    return ds.dataset(files, schema=METRICS_SCHEMA, format="parquet")
+
+def _filter_expr(models: Optional[Iterable[str]] = None, tasks: Optional[Iterable[str]] = None,
+                 start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                 run_ids: Optional[Iterable[str]] = None) -> Optional[ds.Expression]:
+    exprs = []
+    if models:
+        exprs.append(pc.field("model_name").cast(pa.string()).isin(list(models)))
+    if tasks:
+        exprs.append(pc.field("task").cast(pa.string()).isin(list(tasks)))
+    if run_ids:
+        exprs.append(pc.field("run_id").isin(list(run_ids)))
+    if start:
+        exprs.append(pc.field("run_ts") >= pa.scalar(datetime.datetime.combine(start, datetime.time.min), pa.timestamp("s")))
+    if end:
+        exprs.append(pc.field("run_ts") <= pa.scalar(datetime.datetime.combine(end, datetime.time.max), pa.timestamp("s")))
+    if not exprs:
+        return None
+    expr = exprs[0]
+    for e in exprs[1:]:
+        expr = expr & e
+    return expr
+
+def facets(root: str | pathlib.Path = HISTORY_DIR) -> dict:
+    """Distinct models, tasks and the run date range, for building filter widgets."""
+    dset = _dataset(root)
+    if dset is None:
+        return {"models": [], "tasks": [], "min_date": None, "max_date": None, "runs": 0}
+    tbl = dset.to_table(columns=["run_id", "run_ts", "task", "model_name"])
+    ts = pc.min_max(tbl["run_ts"])
+    return {
+        "models": sorted(pc.unique(tbl["model_name"].cast(pa.string())).to_pylist()),
+        "tasks": sorted(pc.unique(tbl["task"].cast(pa.string())).to_pylist()),
+        "min_date": ts["min"].as_py().date(),
+        "max_date": ts["max"].as_py().date(),
+        "runs": len(pc.unique(tbl["run_id"])),
+    }
+
+def count_rows(root: str | pathlib.Path = HISTORY_DIR, **filters) -> int:
+    dset = _dataset(root)
+    return 0 if dset is None else dset.count_rows(filter=_filter_expr(**filters))
+
+def query_page(root: str | pathlib.Path = HISTORY_DIR, page: int = 0, page_size: int = 50,
+               total: Optional[int] = None, **filters) -> tuple[pd.DataFrame, int]:
+    """
+    Return one page of metric rows (newest runs first) plus the total match count.
+    Pass `total` (from count_rows) to skip recounting. Only the rows on the
+    requested page are materialised.
+    """
+    dset = _dataset(root)
+    if dset is None:
+        return pd.DataFrame(columns=METRICS_SCHEMA.names), 0
+    expr = _filter_expr(**filters)
+    if total is None:
+        total = dset.count_rows(filter=expr)
+    lo = max(0, page) * page_size
+    hi = min(total, lo + page_size)
+    if lo >= hi:
+        return pd.DataFrame(columns=METRICS_SCHEMA.names), total
+    # files are sorted by run_id, i.e. oldest run_ts first, so walk indices from the end for newest-first
+    indices = list(range(total - 1 - lo, total - 1 - hi, -1))
+    tbl = dset.take(indices, filter=expr)
+    return tbl.to_pandas(), total
+
+def aggregate(root: str | pathlib.Path = HISTORY_DIR, by: Iterable[str] = ("run_id", "task", "model_type", "model_name"),
+              **filters) -> pd.DataFrame:
+    """Mean scores grouped by `by`, computed on the projected metric columns only."""
+    by = list(by)
+    dset = _dataset(root)
+    if dset is None:
+        return pd.DataFrame(columns=by + METRIC_COLUMNS + ["n"])
+    tbl = dset.to_table(columns=by + METRIC_COLUMNS, filter=_filter_expr(**filters))
+    for name in by:
+        if pa.types.is_dictionary(tbl.schema.field(name).type):
+            tbl = tbl.set_column(tbl.schema.get_field_index(name), name, tbl[name].cast(pa.string()))
+    aggs = [(m, "mean") for m in METRIC_COLUMNS] + [(METRIC_COLUMNS[0], "count")]
+    out = tbl.group_by(by).aggregate(aggs).to_pandas()
+    out = out.rename(columns={f"{m}_mean": m for m in METRIC_COLUMNS})
+    out = out.rename(columns={f"{METRIC_COLUMNS[0]}_count": "n"})
+    return out.sort_values(by).reset_index(drop=True)
+
+def load_output(run_id: str, sample_id: str, task: str, model_type: str,
+                root: str | pathlib.Path = HISTORY_DIR) -> str:
+    """Read a single generated output; only the matching run file is opened."""
+    path = _outputs_dir(root) / f"{run_id}.parquet"
+    if not path.exists():
+        return ""
+    tbl = pq.read_table(
+        path,
+        columns=["output"],
+        filters=[("sample_id", "=", str(sample_id)), ("task", "=", task), ("model_type", "=", model_type)],
+    )
+    return tbl["output"][0].as_py() if tbl.num_rows else ""
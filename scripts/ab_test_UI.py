@@ -15,6 +15,7 @@ if str(ROOT) not in sys.path:
 from app.prompts import RESUME_BULLETS_TMPL, COVER_LETTER_TMPL
 from app.llm import generate_text, GenConfig
 from app.eval import compute_metrics, composite_score
+from app import history
 
 # Optional imports for UI features
 def _try_imports():
@@ -80,7 +81,8 @@ def _build_prompt(task: str, jd: str, resume: str, examples: str) -> str:
         raise ValueError(f"Unknown task: {task}")
 
 def _run_ab_once(samples_dir: str, baseline_model: str, tuned_model: str | None, fewshot_text: str,
-                 tasks: list[str], limit: int, out_dir: pathlib.Path, progress_cb=None):
+                 tasks: list[str], limit: int, out_dir: pathlib.Path, progress_cb=None,
+                 history_dir: str | None = history.HISTORY_DIR):
     sample_dirs = sorted([p for p in glob.glob(os.path.join(samples_dir, "*")) if os.path.isdir(p)])
     if limit:
         sample_dirs = sample_dirs[:limit]
@@ -131,6 +133,8 @@ def _run_ab_once(samples_dir: str, baseline_model: str, tuned_model: str | None,
             if progress_cb:
                 progress_cb(done / max(1, total))
 
+    if not rows:
+        raise ValueError(f"No samples with jd.md and profile.md found in {samples_dir}")
     df = pd.DataFrame(rows)
     results_csv = out_dir / "results.csv"
     df.to_csv(results_csv, index=False)
@@ -140,6 +144,10 @@ def _run_ab_once(samples_dir: str, baseline_model: str, tuned_model: str | None,
     summary_csv = out_dir / "summary.csv"
     summary.to_csv(summary_csv, index=False)
 
+    # append to the columnar run-history store (queried by the History tab)
+    if history_dir:
+        history.append_run(df, out_dir.name, root=history_dir, run_ts=history.run_dir_ts(out_dir))
+
     # package zip for download
     memfile = io.BytesIO()
     with zipfile.ZipFile(memfile, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
@@ -190,62 +198,147 @@ def run_ui():
         run_btn = st.button("Run A/B test", type="primary")
 
     # Main area
-    if run_btn:
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_dir = pathlib.Path(f"results/ab_run_{ts}")
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        st.info(f"Running on **{samples_dir}** → results in `{out_dir}`")
-        prog = st.progress(0.0)
-        status = st.empty()
-
-        def _prog(pct):
-            prog.progress(min(1.0, pct))
-
-        try:
-            df, summary, zip_mem = _run_ab_once(
-                samples_dir=samples_dir,
-                baseline_model=baseline_model,
-                tuned_model=tuned_model.strip() or None,
-                fewshot_text=few_text_area or "",
-                tasks=tasks,
-                limit=limit,
-                out_dir=out_dir,
-                progress_cb=_prog
-            )
-        except Exception as e:
-            st.error(f"Run failed: {e}")
-            return
-
-        st.success("Done!")
-
-        # Show summary
-        st.subheader("Summary (mean scores by task & model)")
-        st.dataframe(summary, use_container_width=True)
-
-        # Simple chart of composite_score
-        try:
-            pivot = summary.pivot(index="model_type", columns=["task", "model_name"], values="composite_score")
-            st.bar_chart(pivot)
-        except Exception:
-            pass
-
-        # Show sample of detailed results
-        st.subheader("Detailed results (sample)")
-        st.dataframe(df.head(20), use_container_width=True)
-
-        # Downloads
-        results_csv = out_dir / "results.csv"
-        summary_csv = out_dir / "summary.csv"
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.download_button("Download results.csv", results_csv.read_bytes(), file_name="results.csv", mime="text/csv")
-        with col2:
-            st.download_button("Download summary.csv", summary_csv.read_bytes(), file_name="summary.csv", mime="text/csv")
-        with col3:
-            st.download_button("Download all (zip)", data=zip_mem, file_name="ab_run.zip", mime="application/zip")
-
-        st.caption(f"Raw outputs saved under `{out_dir}/raw/`.")
+    tab_run, tab_hist = st.tabs(["Run", "History"])
+    with tab_run:
+        if run_btn:
+            _render_run(st, samples_dir, baseline_model, tuned_model, few_text_area, tasks, limit)
+        else:
+            st.caption("Configure the run in the sidebar and press **Run A/B test**.")
+    with tab_hist:
+        _render_history(st, history.HISTORY_DIR)
+
+def _render_run(st, samples_dir, baseline_model, tuned_model, few_text_area, tasks, limit):
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = pathlib.Path(f"results/ab_run_{ts}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    st.info(f"Running on **{samples_dir}** → results in `{out_dir}`")
+    prog = st.progress(0.0)
+    status = st.empty()
+
+    def _prog(pct):
+        prog.progress(min(1.0, pct))
+
+    try:
+        df, summary, zip_mem = _run_ab_once(
+            samples_dir=samples_dir,
+            baseline_model=baseline_model,
+            tuned_model=tuned_model.strip() or None,
+            fewshot_text=few_text_area or "",
+            tasks=tasks,
+            limit=limit,
+            out_dir=out_dir,
+            progress_cb=_prog
+        )
+    except Exception as e:
+        st.error(f"Run failed: {e}")
+        return
+
+    st.success("Done!")
+
+    # Show summary
+    st.subheader("Summary (mean scores by task & model)")
+    st.dataframe(summary, use_container_width=True)
+
+    # Simple chart of composite_score
+    try:
+        pivot = summary.pivot(index="model_type", columns=["task", "model_name"], values="composite_score")
+        st.bar_chart(pivot)
+    except Exception:
+        pass
+
+    # Show sample of detailed results
+    st.subheader("Detailed results (sample)")
+    st.dataframe(df.head(20), use_container_width=True)
+
+    # Downloads
+    results_csv = out_dir / "results.csv"
+    summary_csv = out_dir / "summary.csv"
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Download results.csv", results_csv.read_bytes(), file_name="results.csv", mime="text/csv")
+    with col2:
+        st.download_button("Download summary.csv", summary_csv.read_bytes(), file_name="summary.csv", mime="text/csv")
+    with col3:
+        st.download_button("Download all (zip)", data=zip_mem, file_name="ab_run.zip", mime="application/zip")
+
+    st.caption(f"Raw outputs saved under `{out_dir}/raw/`.")
+
+def _render_history(st, history_dir: str):
+    # Cached reads are keyed on the store fingerprint, so a new run invalidates them.
+    @st.cache_data(show_spinner=False)
+    def _facets(version):
+        return history.facets(history_dir)
+
+    @st.cache_data(show_spinner=False)
+    def _aggregate(version, by, **filters):
+        return history.aggregate(history_dir, by=by, **filters)
+
+    @st.cache_data(show_spinner=False)
+    def _count(version, **filters):
+        return history.count_rows(history_dir, **filters)
+
+    @st.cache_data(show_spinner=False, max_entries=64)
+    def _page(version, page, page_size, total, **filters):
+        return history.query_page(history_dir, page=page, page_size=page_size, total=total, **filters)
+
+    # only offer folders that can actually be imported and aren't stored yet
+    legacy = sorted(p for p in pathlib.Path("results").glob("ab_run_*") if history.import_problem(p) is None)
+    missing = [p for p in legacy if not history.is_imported(p, root=history_dir)]
+    if missing and st.button(f"Import {len(missing)} older run folder(s) into history"):
+        skipped = [p.name for p in missing if not history.import_run_dir(p, root=history_dir)]
+        if skipped:
+            st.warning(f"Skipped {len(skipped)} folder(s) that could not be read: {', '.join(skipped)}")
+
+    version = history.store_version(history_dir)
+    fac = _facets(version)
+    if not fac["runs"]:
+        st.info(f"No runs stored in `{history_dir}` yet.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        models = st.multiselect("Model", fac["models"])
+    with c2:
+        tasks = st.multiselect("Task", fac["tasks"])
+    with c3:
+        dates = st.date_input("Run date", (fac["min_date"], fac["max_date"]),
+                              min_value=fac["min_date"], max_value=fac["max_date"])
+    # date_input returns a 1-tuple while the user is still picking the range end
+    dates = tuple(dates) if isinstance(dates, (tuple, list)) else (dates,)
+    start = dates[0] if dates else None
+    end = dates[1] if len(dates) > 1 else start
+    filters = dict(models=tuple(models), tasks=tuple(tasks), start=start, end=end)
+
+    st.subheader(f"Mean scores across runs ({fac['runs']} runs stored)")
+    overall = _aggregate(version, ("task", "model_type", "model_name"), **filters)
+    st.dataframe(overall, use_container_width=True)
+    per_run = _aggregate(version, ("run_id", "task", "model_name"), **filters)
+    if not per_run.empty:
+        trend = per_run.pivot_table(index="run_id", columns=["task", "model_name"], values="composite_score")
+        trend.columns = [" / ".join(c) for c in trend.columns]
+        st.line_chart(trend)
+
+    st.subheader("Rows")
+    p1, p2 = st.columns(2)
+    with p1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+    total = _count(version, **filters)
+    n_pages = max(1, -(-total // page_size))
+    with p2:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    rows, _ = _page(version, page - 1, page_size, total, **filters)
+    st.caption(f"{total} matching rows")
+    st.dataframe(rows, use_container_width=True)
+
+    # Outputs live in a separate file per run and are only read when asked for.
+    if not rows.empty:
+        labels = [f"{r.run_id} · {r.sample_id} · {r.task} · {r.model_type}" for r in rows.itertuples()]
+        pick = st.selectbox("Show output for", range(len(labels)), format_func=lambda i: labels[i])
+        if st.button("Load output"):
+            r = rows.iloc[pick]
+            st.text_area("Output", history.load_output(r.run_id, r.sample_id, r.task, r.model_type,
+                                                       root=history_dir), height=300)
 
 # ----------------------------
 # CLI fallback
@@ -259,8 +352,28 @@ def main_cli():
     ap.add_argument("--tasks", default="bullets,cover_letter")
     ap.add_argument("--limit", type=int, default=0)
     ap.add_argument("--out", default="")
+    ap.add_argument("--history-dir", default=history.HISTORY_DIR, help="Run-history store ('' to disable)")
+    ap.add_argument("--import-runs", action="store_true", help="Import existing results/ab_run_* folders into history and exit")
     args = ap.parse_args()
 
+    if args.import_runs:
+        imported = already = skipped = 0
+        for p in sorted(pathlib.Path("results").glob("ab_run_*")):
+            problem = history.import_problem(p)
+            if problem:
+                print(f"[ab] Skipped {p} ({problem})")
+                skipped += 1
+            elif history.is_imported(p, root=args.history_dir):
+                already += 1
+            elif history.import_run_dir(p, root=args.history_dir):
+                imported += 1
+            else:
+                print(f"[ab] Skipped {p} (unreadable results.csv)")
+                skipped += 1
+        print(f"[ab] Imported {imported} run(s) into {args.history_dir} "
+              f"({already} already stored, {skipped} skipped)")
+        return
+
     tasks = [t.strip() for t in args.tasks.split(",") if t.strip()]
     fewshot_text = _read_text(args.fewshot) if args.fewshot else ""
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -282,21 +395,21 @@ def main_cli():
         tasks=tasks,
         limit=args.limit,
         out_dir=out_dir,
-        progress_cb=None
+        progress_cb=None,
+        history_dir=args.history_dir or None
     )
     print("\n[ab] Summary (means):")
     print(summary.to_string(index=False))
     print(f"\n[ab] Wrote results to: {out_dir}")
 
 if __name__ == "__main__":
-    # If launched via Streamlit, just render UI. Otherwise, use CLI entry.
+    # "streamlit run" renders the UI; plain "python scripts/ab_test_UI.py ..." uses the CLI.
     try:
-        import streamlit as _st  # noqa
-        # If streamlit is present AND we are launched via "streamlit run", render the UI
-        if any("streamlit" in a for a in sys.argv):
-            run_ui()
-        else:
-            # If someone runs "python scripts/ab_test.py", try to render UI anyway if streamlit is installed
-            run_ui()
+        from streamlit import runtime as _st_runtime
+        under_streamlit = _st_runtime.exists()
     except Exception:
+        under_streamlit = False
+    if under_streamlit:
+        run_ui()
+    else:
         main_cli()
@@ -0,0 +1,131 @@
+# tests/test_history.py
+# Behaviour checks for the Parquet run-history store (app/history.py).
+
+import datetime, pathlib, sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import history
+
+
+def _rows(tag: str) -> pd.DataFrame:
+    rows = []
+    for sid in ("s1", "s2"):
+        for task in ("bullets", "cover_letter"):
+            for mt, model in (("baseline", "gpt-4o-mini"), ("tuned", "ft:x")):
+                rows.append({
+                    "sample_id": sid, "task": task, "model_type": mt, "model_name": model,
+                    "output": f"{tag} {sid} {task} {mt}",
+                    "keyword_coverage": 0.5, "quantify_score": 0.2,
+                    "length_ok": True if task == "cover_letter" else None,
+                    "composite_score": 0.4 if mt == "baseline" else 0.6,
+                })
+    return pd.DataFrame(rows)
+
+
+def _store(tmp_path):
+    root = tmp_path / "history"
+    ids = [
+        history.append_run(_rows("a"), "ab_run_a", root=root, run_ts=datetime.datetime(2026, 1, 1, 9)),
+        history.append_run(_rows("b"), "ab_run_b", root=root, run_ts=datetime.datetime(2026, 1, 2, 23, 59, 59)),
+        # same folder name, later run: must not overwrite and must sort newest
+        history.append_run(_rows("c"), "ab_run_a", root=root, run_ts=datetime.datetime(2026, 1, 3, 9)),
+    ]
+    return root, ids
+
+
+def test_append_writes_dictionary_columns_and_nullable_length_ok(tmp_path):
+    root, ids = _store(tmp_path)
+    assert len(set(ids)) == 3
+    tbl = pq.read_table(root / "metrics" / f"{ids[0]}.parquet")
+    for name in history.DICT_COLUMNS:
+        assert pa.types.is_dictionary(tbl.schema.field(name).type)
+    df = tbl.to_pandas()
+    assert df.loc[df.task == "bullets", "length_ok"].isna().all()
+    assert df.loc[df.task == "cover_letter", "length_ok"].eq(True).all()
+    assert "output" not in tbl.column_names
+
+
+def test_filters_on_dictionary_columns_and_dates(tmp_path):
+    root, _ = _store(tmp_path)
+    assert history.count_rows(root) == 24
+    assert history.count_rows(root, models=["ft:x"]) == 12
+    assert history.count_rows(root, models=["ft:x"], tasks=["bullets"]) == 6
+    # end date includes the whole day (time.max), start date from midnight
+    day2 = datetime.date(2026, 1, 2)
+    assert history.count_rows(root, start=day2, end=day2) == 8
+    assert history.count_rows(root, start=day2) == 16
+
+
+def test_query_page_is_newest_first(tmp_path):
+    root, ids = _store(tmp_path)
+    first, total = history.query_page(root, page=0, page_size=5, tasks=["bullets"])
+    assert total == 12
+    assert len(first) == 5
+    assert first.run_id.tolist() == [ids[2]] * 4 + [ids[1]]
+    last, _ = history.query_page(root, page=2, page_size=5, total=total, tasks=["bullets"])
+    assert len(last) == 2
+    assert set(last.run_id) == {ids[0]}
+    empty, _ = history.query_page(root, page=5, page_size=5)
+    assert empty.empty
+
+
+def test_aggregate_and_facets(tmp_path):
+    root, _ = _store(tmp_path)
+    agg = history.aggregate(root, by=("model_type",))
+    assert agg.model_type.tolist() == ["baseline", "tuned"]
+    assert agg.composite_score.round(6).tolist() == [0.4, 0.6]
+    assert agg.n.tolist() == [12, 12]
+    fac = history.facets(root)
+    assert fac["runs"] == 3
+    assert fac["models"] == ["ft:x", "gpt-4o-mini"]
+    assert fac["min_date"] == datetime.date(2026, 1, 1)
+    assert fac["max_date"] == datetime.date(2026, 1, 3)
+
+
+def test_load_output_reads_single_row(tmp_path):
+    root, ids = _store(tmp_path)
+    assert history.load_output(ids[1], "s2", "cover_letter", "tuned", root=root) == "b s2 cover_letter tuned"
+    assert history.load_output(ids[1], "nope", "bullets", "tuned", root=root) == ""
+    assert history.load_output("missing", "s1", "bullets", "tuned", root=root) == ""
+
+
+def test_import_run_dir(tmp_path):
+    root = tmp_path / "history"
+    run_dir = tmp_path / "results" / "ab_run_20250101_101010"
+    run_dir.mkdir(parents=True)
+    _rows("legacy").to_csv(run_dir / "results.csv", index=False)
+    assert not history.is_imported(run_dir, root=root)
+    assert history.import_run_dir(run_dir, root=root)
+    assert history.is_imported(run_dir, root=root)
+    rows, total = history.query_page(root)
+    assert total == 8
+    assert rows.run_ts.iloc[0] == pd.Timestamp("2025-01-01 10:10:10")
+
+
+def test_import_run_dir_skips_empty_results(tmp_path):
+    root = tmp_path / "history"
+    run_dir = tmp_path / "results" / "ab_run_20250101_101010"
+    run_dir.mkdir(parents=True)
+    # what _run_ab_once leaves behind when no samples produced rows
+    pd.DataFrame().to_csv(run_dir / "results.csv", index=False)
+    assert not history.import_run_dir(run_dir, root=root)
+    assert history.count_rows(root) == 0
+
+
+def test_import_problem_reasons(tmp_path):
+    missing = tmp_path / "ab_run_20250101_101010"
+    missing.mkdir()
+    assert history.import_problem(missing) == "no results.csv"
+    (missing / "results.csv").write_text("\n", encoding="utf-8")
+    assert history.import_problem(missing) == "empty or unreadable results.csv"
+    (missing / "results.csv").write_text("sample_id,task\n", encoding="utf-8")
+    assert history.import_problem(missing) == "empty or unreadable results.csv"
+    _rows("ok").to_csv(missing / "results.csv", index=False)
+    assert history.import_problem(missing) is None